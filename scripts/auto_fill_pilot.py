@@ -7,13 +7,22 @@ Heurísticas aplicadas:
 - `evidencias`: primeiro trecho de `sample_text` (até 500 chars)
 
 Gera: `outputs/pilot_30_filled.xlsx` e `outputs/pilot_30_filled.csv`
+(com `--shard i/N`, apenas os processos do shard, em `outputs/shards/shard_<i>_of_<N>/`)
 
-Uso: python scripts/auto_fill_pilot.py
+Uso: python scripts/auto_fill_pilot.py [--shard i/N]
 """
 import os
+import sys
+import time
+import argparse
 from pathlib import Path
 import pandas as pd
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+from starter_scripts.sharding import ORDER_COL, in_shard, parse_shard, row_key, shard_dir, update_metrics
+
 
 def load_files(pilot_csv='outputs/pilot_30.csv', model_xlsx='outputs/modelo_respostas.xlsx'):
     p_pilot = Path(pilot_csv)
@@ -53,19 +62,30 @@ def fill_row(row):
     return filled
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preenche as 14 perguntas do piloto (rascunho).")
+    parser.add_argument('--shard', type=parse_shard, default=None, help='processa só o shard i de N (formato i/N)')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
     pilot, model = load_files()
     rows = []
-    for _, r in pilot.iterrows():
+    for idx, r in pilot.iterrows():
+        if not in_shard(row_key(r, idx), args.shard):
+            continue
         filled = fill_row(r)
+        if args.shard:
+            filled[ORDER_COL] = idx
         rows.append(filled)
     df_out = pd.DataFrame(rows)
-    out_dir = Path('outputs')
-    out_dir.mkdir(exist_ok=True)
+    out_dir = shard_dir(args.shard) if args.shard else Path('outputs')
+    out_dir.mkdir(parents=True, exist_ok=True)
     out_xlsx = out_dir / 'pilot_30_filled.xlsx'
     out_csv = out_dir / 'pilot_30_filled.csv'
     df_out.to_excel(out_xlsx, index=False)
     df_out.to_csv(out_csv, index=False)
+    if args.shard:
+        update_metrics(out_dir, args.shard, 'auto_fill_pilot', {'rows': len(df_out), 'seconds': round(time.perf_counter() - t0, 3)})
     print(f'Preenchimento automático salvo: {out_xlsx} (linhas={len(df_out)})')
 
 
@@ -8,12 +8,16 @@ Heurísticas adicionais implementadas (rascunho):
 - preenche perguntas 1..9 quando aplicável e adiciona coluna `confidence` (0..1)
 
 Gera: `outputs/pilot_30_filled_advanced.xlsx` e CSV correspondente.
+(com `--shard i/N`, apenas os processos do shard, em `outputs/shards/shard_<i>_of_<N>/`)
 
-Uso: python scripts/auto_fill_pilot_advanced.py
+Uso: python scripts/auto_fill_pilot_advanced.py [--shard i/N]
 """
 import os
+import sys
 import json
 import re
+import time
+import argparse
 from pathlib import Path
 import pandas as pd
 import logging
@@ -24,6 +28,12 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+from starter_scripts.sharding import ORDER_COL, in_shard, parse_shard, row_key, shard_dir, update_metrics
+from starter_scripts.text_norm import NORM_COL, normalize_series, normalize_text
+
 
 RE_CNPJ = re.compile(r"\b(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}|\d{14})\b")
 RE_CPF = re.compile(r"\b(\d{3}\.\d{3}\.\d{3}-\d{2}|\d{11})\b")
@@ -32,11 +42,13 @@ RE_YEAR = re.compile(r"\b(19|20)\d{2}\b")
 RE_VALOR = re.compile(r"R\$\s?[\d\.]+(?:,\d{2})?")
 
 
-KEYS_SENTENCA = ["sentença", "acórdão", "decisão", "julg", "conden"]
-KEYS_INDEMN = ["indeniz", "indenização", "indeniza", "indenizado", "indenizar"]
-KEYS_ACIDENTE = ["acident", "colis", "batida", "acidente de trânsito", "capot"]
-KEYS_VITIMA = ["vítim", "vitim", "ferid", "morto", "óbito", "morte"]
-KEYS_EXEC = ["execução", "penhora", "arresto", "bloqueio", "protesto", "cobrança"]
+# keywords are matched against normalized text (casefold, no accents, collapsed
+# spaces; see starter_scripts/text_norm.py), so one unaccented form covers both spellings
+KEYS_SENTENCA = ["sentenca", "acordao", "decisao", "julg", "conden"]
+KEYS_INDEMN = ["indeniz"]
+KEYS_ACIDENTE = ["acident", "colis", "batida", "capot"]
+KEYS_VITIMA = ["vitim", "ferid", "morto", "obito", "morte"]
+KEYS_EXEC = ["execucao", "penhora", "arresto", "bloqueio", "protesto", "cobranca"]
 
 
 def extract_first(regex, text):
@@ -44,8 +56,8 @@ def extract_first(regex, text):
     return m.group(0) if m else ''
 
 
-def contains_any(text, keywords):
-    t = text.lower()
+def contains_any(text, keywords, normalized=False):
+    t = text if normalized else normalize_text(text)
     return any(k in t for k in keywords)
 
 
@@ -56,8 +68,57 @@ def score_matches(matches):
     return sum(1 for v in matches if v) / len(matches)
 
 
+# HEURISTICS_MODE — ordem de resolução (do mais prioritário ao menos):
+# 1. Variável de ambiente `HEURISTICS_MODE`
+# 2. Arquivo de configuração `heuristics.yml` / `heuristics.yaml` / `heuristics.json` com chave `mode`
+# 3. Padrão: 'strict'
+def get_heuristics_mode():
+    # 1) env
+    env_mode = os.getenv('HEURISTICS_MODE')
+    if env_mode:
+        return env_mode.lower()
+    # 2) file in repo root
+    repo_root = Path(__file__).resolve().parents[1]
+    y_paths = [repo_root / 'heuristics.yml', repo_root / 'heuristics.yaml']
+    j_path = repo_root / 'heuristics.json'
+    for p in y_paths:
+        if p.exists() and yaml is not None:
+            try:
+                cfg = yaml.safe_load(p.read_text()) or {}
+                m = cfg.get('mode') or cfg.get('HEURISTICS_MODE') or cfg.get('heuristics_mode')
+                if m:
+                    return str(m).lower()
+            except Exception:
+                continue
+    if j_path.exists():
+        try:
+            cfg = json.loads(j_path.read_text())
+            m = cfg.get('mode') or cfg.get('HEURISTICS_MODE') or cfg.get('heuristics_mode')
+            if m:
+                return str(m).lower()
+        except Exception:
+            pass
+    # validate
+    allowed = {'strict', 'lenient'}
+    if isinstance(p, Path):
+        pass
+    # At this point 'm' may be set from files; validate it
+    if 'm' in locals() and m:
+        mval = str(m).lower()
+        if mval in allowed:
+            return mval
+        else:
+            logger.warning("Valor inválido para 'mode' em arquivo de heurísticas: '%s'. Usando 'strict' por padrão.", m)
+            return 'strict'
+    return 'strict'
+
+
 def fill_advanced(row):
     txt = str(row.get('sample_text','') or '').lower()
+    # matchers read the normalized text, precomputed by the pipeline when available
+    norm = row.get(NORM_COL)
+    if not isinstance(norm, str):
+        norm = normalize_text(txt)
     filled = {}
     # pergunta_1 and _2 kept from base heuristics if present
     itau = str(row.get('itau_flag','')).lower() in ('true','1','sim','yes','y','t')
@@ -66,81 +127,37 @@ def fill_advanced(row):
     filled['pergunta_2'] = 'sim' if veic else 'nao'
 
     # pergunta_3: presença de sentença/decisão
-    p3 = contains_any(txt, KEYS_SENTENCA)
+    p3 = contains_any(norm, KEYS_SENTENCA, normalized=True)
     filled['pergunta_3'] = 'sim' if p3 else 'nao'
 
-    # pergunta_4: comportamento configurável via HEURISTICS_MODE
-    # Ordem de resolução (do mais prioritário ao menos):
-    # 1. Variável de ambiente `HEURISTICS_MODE`
-    # 2. Arquivo de configuração `heuristics.yml` / `heuristics.yaml` / `heuristics.json` com chave `mode`
-    # 3. Padrão: 'strict'
-    def get_heuristics_mode():
-        # 1) env
-        env_mode = os.getenv('HEURISTICS_MODE')
-        if env_mode:
-            return env_mode.lower()
-        # 2) file in repo root
-        repo_root = Path(__file__).resolve().parents[1]
-        y_paths = [repo_root / 'heuristics.yml', repo_root / 'heuristics.yaml']
-        j_path = repo_root / 'heuristics.json'
-        for p in y_paths:
-            if p.exists() and yaml is not None:
-                try:
-                    cfg = yaml.safe_load(p.read_text()) or {}
-                    m = cfg.get('mode') or cfg.get('HEURISTICS_MODE') or cfg.get('heuristics_mode')
-                    if m:
-                        return str(m).lower()
-                except Exception:
-                    continue
-        if j_path.exists():
-            try:
-                cfg = json.loads(j_path.read_text())
-                m = cfg.get('mode') or cfg.get('HEURISTICS_MODE') or cfg.get('heuristics_mode')
-                if m:
-                    return str(m).lower()
-            except Exception:
-                pass
-        # validate
-        allowed = {'strict', 'lenient'}
-        if isinstance(p, Path):
-            pass
-        # At this point 'm' may be set from files; validate it
-        if 'm' in locals() and m:
-            mval = str(m).lower()
-            if mval in allowed:
-                return mval
-            else:
-                logger.warning("Valor inválido para 'mode' em arquivo de heurísticas: '%s'. Usando 'strict' por padrão.", m)
-                return 'strict'
-        return 'strict'
-
+    # pergunta_4: comportamento configurável via HEURISTICS_MODE (ver get_heuristics_mode)
     mode = get_heuristics_mode()
     if mode == 'lenient':
-        p4 = contains_any(txt, KEYS_INDEMN) or bool(RE_VALOR.search(txt))
+        p4 = contains_any(norm, KEYS_INDEMN, normalized=True) or bool(RE_VALOR.search(norm))
     else:
-        p4 = bool(RE_VALOR.search(txt))
+        p4 = bool(RE_VALOR.search(norm))
     filled['pergunta_4'] = 'sim' if p4 else 'nao'
 
     # pergunta_5: extrair CNPJ/CPF se houver
-    cnpj = extract_first(RE_CNPJ, txt)
-    cpf = extract_first(RE_CPF, txt)
+    cnpj = extract_first(RE_CNPJ, norm)
+    cpf = extract_first(RE_CPF, norm)
     filled['pergunta_5'] = cnpj or cpf or ''
 
     # pergunta_6: extrair primeira data ou ano
-    date = extract_first(RE_DATE, txt)
-    year = extract_first(RE_YEAR, txt)
+    date = extract_first(RE_DATE, norm)
+    year = extract_first(RE_YEAR, norm)
     filled['pergunta_6'] = date or year or ''
 
     # pergunta_7: acidente
-    p7 = contains_any(txt, KEYS_ACIDENTE)
+    p7 = contains_any(norm, KEYS_ACIDENTE, normalized=True)
     filled['pergunta_7'] = 'sim' if p7 else 'nao'
 
     # pergunta_8: vítima/óbito
-    p8 = contains_any(txt, KEYS_VITIMA)
+    p8 = contains_any(norm, KEYS_VITIMA, normalized=True)
     filled['pergunta_8'] = 'sim' if p8 else 'nao'
 
     # pergunta_9: execução/penhora
-    p9 = contains_any(txt, KEYS_EXEC)
+    p9 = contains_any(norm, KEYS_EXEC, normalized=True)
     filled['pergunta_9'] = 'sim' if p9 else 'nao'
 
     # perguntas 10-14: mantêm em branco
@@ -161,20 +178,110 @@ def fill_advanced(row):
     return filled
 
 
-def main():
+TRUTHY = ('true', '1', 'sim', 'yes', 'y', 't')
+
+
+def _keys_regex(keywords):
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+def _first_match(texts, regex):
+    # extract_first for a Series: whole match of the first hit, '' when none
+    return texts.str.extract(f"({regex.pattern})", expand=True)[0].fillna('')
+
+
+def fill_advanced_frame(df, mode=None):
+    """Vectorized fill_advanced over a whole DataFrame (same output, one row per input row).
+
+    The heuristics mode is resolved once instead of once per row, and the text is
+    normalized in one pass unless sample_text_norm is already there.
+    """
+    mode = mode or get_heuristics_mode()
+    n = len(df)
+    col = lambda c: df[c] if c in df.columns else pd.Series([''] * n, index=df.index, dtype=object)
+    txt = pd.Series([str(v or '').lower() for v in col('sample_text')], index=df.index, dtype=object)
+    if NORM_COL in df.columns:
+        norm = df[NORM_COL].astype(object).copy()
+        missing = ~norm.map(lambda v: isinstance(v, str))
+        if missing.any():
+            norm[missing] = normalize_series(txt[missing])
+    else:
+        norm = normalize_series(txt)
+    yes_no = lambda m: m.map({True: 'sim', False: 'nao'})
+
+    itau = col('itau_flag').astype(str).str.lower().isin(TRUTHY)
+    veic = col('veiculos_flag').astype(str).str.lower().isin(TRUTHY)
+    p3 = norm.str.contains(_keys_regex(KEYS_SENTENCA))
+    p4 = norm.str.contains(RE_VALOR)
+    if mode == 'lenient':
+        p4 = norm.str.contains(_keys_regex(KEYS_INDEMN)) | p4
+    cnpj = _first_match(norm, RE_CNPJ)
+    cpf = _first_match(norm, RE_CPF)
+    date = _first_match(norm, RE_DATE)
+    year = _first_match(norm, RE_YEAR)
+    p7 = norm.str.contains(_keys_regex(KEYS_ACIDENTE))
+    p8 = norm.str.contains(_keys_regex(KEYS_VITIMA))
+    p9 = norm.str.contains(_keys_regex(KEYS_EXEC))
+    doc = cnpj.where(cnpj.ne(''), cpf)
+    when = date.where(date.ne(''), year)
+    matches = [itau, veic, p3, p4, doc.ne(''), when.ne(''), p7, p8, p9]
+    hits = sum(m.astype(int) for m in matches)
+
+    out = {
+        'pergunta_1': yes_no(itau),
+        'pergunta_2': yes_no(veic),
+        'pergunta_3': yes_no(p3),
+        'pergunta_4': yes_no(p4),
+        'pergunta_5': doc,
+        'pergunta_6': when,
+        'pergunta_7': yes_no(p7),
+        'pergunta_8': yes_no(p8),
+        'pergunta_9': yes_no(p9),
+    }
+    for i in range(10, 15):
+        out[f'pergunta_{i}'] = [''] * n
+    out['evidencias'] = txt.where(txt.str.len() <= 800, txt.str[:800] + '...')
+    out['confidence'] = [round(h / len(matches), 2) for h in hits]
+    out['numero_processo'] = [a or b or '' for a, b in zip(col('numero_processo'), col('numero_proc_norm'))]
+    return pd.DataFrame({k: list(v) for k, v in out.items()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preenchimento avançado (heurísticas) do piloto.")
+    parser.add_argument('--shard', type=parse_shard, default=None, help='processa só o shard i de N (formato i/N)')
+    parser.add_argument('--engine', choices=['legacy', 'fast'], default='legacy', help='legacy: fill_advanced por linha; fast: fill_advanced_frame')
+    args = parser.parse_args(argv)
+
     p_pilot = Path('outputs/pilot_30.csv')
     if not p_pilot.exists():
         print('Arquivo pilot_30.csv não encontrado. Rode o pipeline e gere o piloto primeiro.')
         return
+    t0 = time.perf_counter()
     pilot = pd.read_csv(p_pilot, dtype=str)
-    rows = []
-    for _, r in pilot.iterrows():
-        rows.append(fill_advanced(r))
-    df = pd.DataFrame(rows)
-    out_xlsx = Path('outputs/pilot_30_filled_advanced.xlsx')
-    out_csv = Path('outputs/pilot_30_filled_advanced.csv')
+    if args.engine == 'fast':
+        keep = [in_shard(row_key(r, idx), args.shard) for idx, r in pilot.iterrows()]
+        pilot = pilot[keep]
+        df = fill_advanced_frame(pilot)
+        if args.shard:
+            df[ORDER_COL] = list(pilot.index)
+    else:
+        rows = []
+        for idx, r in pilot.iterrows():
+            if not in_shard(row_key(r, idx), args.shard):
+                continue
+            filled = fill_advanced(r)
+            if args.shard:
+                filled[ORDER_COL] = idx
+            rows.append(filled)
+        df = pd.DataFrame(rows)
+    out_dir = shard_dir(args.shard) if args.shard else Path('outputs')
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_xlsx = out_dir / 'pilot_30_filled_advanced.xlsx'
+    out_csv = out_dir / 'pilot_30_filled_advanced.csv'
     df.to_excel(out_xlsx, index=False)
     df.to_csv(out_csv, index=False)
+    if args.shard:
+        update_metrics(out_dir, args.shard, 'auto_fill_pilot_advanced', {'rows': len(df), 'seconds': round(time.perf_counter() - t0, 3)})
     logger.info('Preenchimento avançado salvo: %s (linhas=%d)', out_xlsx, len(df))
 
 
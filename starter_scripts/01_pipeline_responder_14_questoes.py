@@ -2,20 +2,46 @@
 Pipeline: consolida múltiplos CSVs, normaliza número do processo e gera flags iniciais.
 Gera: outputs/consolidado_flags.csv e outputs/consolidado_flags.json
 
-Uso: python starter_scripts/01_pipeline_responder_14_questoes.py
+Modo out-of-core (`--out-of-core`): para dados maiores que a memória. As linhas são
+particionadas por hash de `numero_proc_norm` em arquivos temporários durante a leitura
+e cada partição é consolidada separadamente; o resultado é idêntico ao modo em memória.
+
+Execução em shards (`--shard i/N`): processa só os processos do shard i (hash estável de
+`numero_proc_norm`) e grava em outputs/shards/shard_<i>_of_<N>/; junte com 04_merge_shards.py.
+
+Colunas lidas por fonte: definidas no registro de schemas (`schemas.yml` na raiz ou `--schemas`),
+ver starter_scripts/schemas.py.
+
+Uso: python starter_scripts/01_pipeline_responder_14_questoes.py [--out-of-core] [--partitions 64] [--shard i/N] [--schemas schemas.yml]
 """
 import os
 import re
+import sys
 import json
+import time
+import heapq
+import argparse
+import tempfile
 from glob import glob
+from itertools import islice
 from pathlib import Path
 import pandas as pd
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+from starter_scripts.sharding import ORDER_COL, in_shard, parse_shard, shard_dir, stable_hash, update_metrics
+from starter_scripts.text_norm import NORM_COL, normalize_series, normalize_text
+from starter_scripts.schemas import load_schemas, read_csv, typed_columns
 
-ITAU_PATTERNS = [r"\bita[uú]?\b", r"itau unibanco", r"itauunibanco", r"\bitau\b"]
+
+# patterns are matched against normalized text (see starter_scripts/text_norm.py):
+# write them casefolded and without accents ('onibus' also matches 'Ônibus').
+# str entries are plain substrings; use re.compile() for a regex
+ITAU_PATTERNS = [re.compile(r"\bitau\b"), "itauunibanco"]
 VEIC_PATTERNS = [
-    "caminh", "carret", "onibus", "ônibus", "bitrem", "rodotrem", "semirreboque",
-    "reboque", "implemento", "basculante", "carreta", "cavalo-mec", "veiculo", "veículos"
+    "caminh", "carret", "onibus", "bitrem", "rodotrem", "semirreboque",
+    "reboque", "implemento", "basculante", "carreta", "cavalo-mec", "veiculo"
 ]
 
 
@@ -28,10 +54,11 @@ def normalize_proc(s: str) -> str:
     return digits
 
 
-def text_has_any(text: str, patterns) -> bool:
+def text_has_any(text: str, patterns, normalized: bool = False) -> bool:
+    """Pass normalized=True when `text` already comes from normalize_text/sample_text_norm."""
     if not isinstance(text, str):
         return False
-    t = text.lower()
+    t = text if normalized else normalize_text(text)
     for p in patterns:
         if isinstance(p, str):
             if p in t:
@@ -43,7 +70,7 @@ def text_has_any(text: str, patterns) -> bool:
     return False
 
 
-def load_csvs(base_dir: str = "."):
+def list_csvs(base_dir: str = "."):
     paths = []
     # Only look inside the `data/` directory to avoid picking CSVs from venv or packages
     p = Path(base_dir) / "data"
@@ -51,18 +78,19 @@ def load_csvs(base_dir: str = "."):
         paths.extend([str(x) for x in p.glob("**/*.csv")])
     else:
         print("Atenção: pasta 'data/' não encontrada — nenhum CSV será carregado.")
-    # dedupe
-    unique = []
-    for f in paths:
-        if f not in unique:
-            unique.append(f)
+    # dedupe and sort: row indexes (ROW_<idx> keys, shard __order) depend on file
+    # order, so it must not depend on how the filesystem lists the directory
+    return sorted(set(paths))
+
+
+def load_csvs(base_dir: str = ".", schemas=None):
     dfs = []
-    for f in unique:
+    for f in list_csvs(base_dir):
         try:
-            df = pd.read_csv(f, dtype=str, encoding="utf-8")
+            df = read_csv(f, schemas, encoding="utf-8")
         except Exception:
             try:
-                df = pd.read_csv(f, dtype=str, encoding="latin1")
+                df = read_csv(f, schemas, encoding="latin1")
             except Exception:
                 print(f"Falha ao ler {f}, pulando.")
                 continue
@@ -76,67 +104,394 @@ def load_csvs(base_dir: str = "."):
     return big
 
 
-def consolidate_and_flag(big: pd.DataFrame):
+def proc_number(row) -> str:
+    return normalize_proc(row.get('numero_processo') or row.get('processo') or row.get('processo_num') or '')
+
+
+def text_columns(df: pd.DataFrame) -> list:
+    """Columns joined into sample_text: string columns except __source. Columns typed
+    by a file's schema are skipped per row (see make_sample_text / typed_columns)."""
+    # is_string_dtype covers both object and the pandas>=3 default 'str' dtype
+    return [c for c in df.columns if c != "__source" and pd.api.types.is_string_dtype(df[c].dtype)]
+
+
+def make_sample_text(row, text_cols, skip=()) -> str:
+    parts = []
+    for c in text_cols:
+        if c in skip:
+            continue
+        v = row.get(c)
+        if pd.isna(v):
+            continue
+        s = str(v).strip()
+        if s:
+            parts.append(s)
+    return " \n ".join(parts)
+
+
+def add_to_group(grouped: dict, key: str, idx: int, numero_processo, txt: str, source: str):
+    entry = grouped.get(key, {"numero_processo": numero_processo, "first_row": idx, "sample_text": [], "sources": set()})
+    entry['sample_text'].append(txt)
+    entry['sources'].add(source)
+    grouped[key] = entry
+    return entry
+
+
+def group_to_row(k: str, v: dict) -> dict:
+    return {
+        'numero_processo': v.get('numero_processo') or k,
+        'numero_proc_norm': k,
+        'sample_text': '\n---\n'.join([s for s in v.get('sample_text') if s]),
+        'sources': ','.join(sorted([s for s in v.get('sources') if s]))
+    }
+
+
+def finish_consolidated(rows, fast: bool = False) -> pd.DataFrame:
+    """Build the output frame: normalize each process text once (vectorized) into
+    sample_text_norm and compute the flags on it."""
+    out = pd.DataFrame(rows)
+    if out.empty:
+        return out
+    norm = normalize_series(out['sample_text'])
+    if fast:
+        itau = series_has_any(out['sample_text'], compile_patterns(ITAU_PATTERNS), norm)
+        veic = series_has_any(out['sample_text'], compile_patterns(VEIC_PATTERNS), norm)
+    else:
+        itau = [text_has_any(t, ITAU_PATTERNS, normalized=True) for t in norm]
+        veic = [text_has_any(t, VEIC_PATTERNS, normalized=True) for t in norm]
+    out.insert(out.columns.get_loc('numero_proc_norm') + 1, 'itau_flag', itau)
+    out.insert(out.columns.get_loc('itau_flag') + 1, 'veiculos_flag', veic)
+    out.insert(out.columns.get_loc('sample_text') + 1, NORM_COL, list(norm))
+    return out
+
+
+def consolidate_and_flag(big: pd.DataFrame, shard=None, typed_cols=None):
+    """Group rows by process and compute the flags.
+
+    With `shard=(i, N)` only the processes of that shard are kept, and the output
+    gets an `__order` column (first row index) used by the shard merge.
+    `typed_cols` (schemas.typed_columns of the loaded files: {__source: columns})
+    are left out of the sample_text of the rows of that source.
+    """
+    typed_cols = typed_cols or {}
     if big.empty:
         print("Nenhum dado carregado.")
         return pd.DataFrame()
 
     # create a sample_text by concatenating string columns
-    text_cols = [c for c in big.columns if big[c].dtype == object]
-    # exclude __source from sample_text concatenation
-    text_cols = [c for c in text_cols if c != "__source"]
-
-    def make_sample_text(row):
-        parts = []
-        for c in text_cols:
-            v = row.get(c)
-            if pd.isna(v):
-                continue
-            s = str(v).strip()
-            if s:
-                parts.append(s)
-        return " \n ".join(parts)
+    text_cols = text_columns(big)
 
-    big['numero_proc_norm'] = big.apply(lambda r: normalize_proc(r.get('numero_processo') or r.get('processo') or r.get('processo_num') or ''), axis=1)
-    big['sample_text'] = big.apply(make_sample_text, axis=1)
+    big['numero_proc_norm'] = big.apply(proc_number, axis=1)
+    if shard is not None:
+        # keys use the global row index, so ROW_<idx> lands in the same shard on every node
+        keep = [in_shard(k or f"ROW_{idx}", shard) for idx, k in big['numero_proc_norm'].items()]
+        big = big[keep].copy()
+    big['sample_text'] = big.apply(lambda r: make_sample_text(r, text_cols, typed_cols.get(r.get('__source'), ())), axis=1)
 
     grouped = {}
     for idx, row in big.iterrows():
         key = row['numero_proc_norm'] or f"ROW_{idx}"
-        entry = grouped.get(key, {"numero_processo": row.get('numero_processo',''), "sample_text": [], "sources": set(), "itau": False, "veic": False})
-        txt = row.get('sample_text','') or ''
-        entry['sample_text'].append(txt)
-        entry['sources'].add(row.get('__source',''))
-        if text_has_any(txt, ITAU_PATTERNS):
-            entry['itau'] = True
-        if text_has_any(txt, VEIC_PATTERNS):
-            entry['veic'] = True
-        grouped[key] = entry
-
-    rows = []
-    for k, v in grouped.items():
-        rows.append({
-            'numero_processo': v.get('numero_processo') or k,
-            'numero_proc_norm': k,
-            'itau_flag': bool(v.get('itau', False)),
-            'veiculos_flag': bool(v.get('veic', False)),
-            'sample_text': '\n---\n'.join([s for s in v.get('sample_text') if s]),
-            'sources': ','.join(sorted([s for s in v.get('sources') if s]))
-        })
+        add_to_group(grouped, key, idx, row.get('numero_processo', ''), row.get('sample_text', '') or '', row.get('__source', ''))
 
-    out = pd.DataFrame(rows)
+    out = finish_consolidated([group_to_row(k, v) for k, v in grouped.items()])
+    if shard is not None:
+        out[ORDER_COL] = [v['first_row'] for v in grouped.values()]
     return out
 
 
-def main():
-    big = load_csvs()
-    out = consolidate_and_flag(big)
-    os.makedirs('outputs', exist_ok=True)
-    csv_path = 'outputs/consolidado_flags.csv'
-    json_path = 'outputs/consolidado_flags.json'
-    if not out.empty:
-        out.to_csv(csv_path, index=False)
-        out.to_json(json_path, orient='records', force_ascii=False)
+# --- fast engine ------------------------------------------------------------
+# Vectorized equivalents of text_has_any / consolidate_and_flag. They must produce
+# exactly the legacy outputs; starter_scripts/05_compare_engines.py checks that.
+
+def compile_patterns(patterns):
+    """Split a text_has_any pattern list into plain substrings and compiled regexes."""
+    literals = tuple(p for p in patterns if isinstance(p, str))
+    regexes = tuple(p for p in patterns if not isinstance(p, str))
+    return literals, regexes
+
+
+def series_has_any(texts, compiled, normalized=None) -> list:
+    """text_has_any over many texts (non-str values are False).
+
+    Pass `normalized` (normalize_series of the same texts) to share one
+    normalization between every pattern family.
+    """
+    literals, regexes = compiled
+    if normalized is None:
+        normalized = normalize_series(pd.Series(texts))
+    return [isinstance(raw, str) and (any(p in t for p in literals) or any(r.search(t) for r in regexes))
+            for raw, t in zip(texts, normalized)]
+
+
+def consolidate_and_flag_fast(big: pd.DataFrame, typed_cols=None):
+    if big.empty:
+        print("Nenhum dado carregado.")
+        return pd.DataFrame()
+
+    typed_cols = typed_cols or {}
+    text_cols = text_columns(big)
+    source = big['__source'] if '__source' in big.columns else pd.Series("", index=big.index)
+
+    # proc_number: first truthy of numero_processo/processo/processo_num; NaN counts as truthy
+    raw = pd.Series("", index=big.index, dtype=object)
+    unset = pd.Series(True, index=big.index)
+    for c in ('numero_processo', 'processo', 'processo_num'):
+        if c in big.columns:
+            col = big[c].astype(object)
+            raw = raw.mask(unset, col)
+            unset = unset & col.eq("")
+    norm = raw.where(raw.notna(), "").astype(str).str.replace(r"\D", "", regex=True)
+
+    # make_sample_text: non-empty stripped values joined with " \n "
+    sample = pd.Series("", index=big.index, dtype=object)
+    for c in text_cols:
+        col = big[c].astype(object)
+        part = col.where(col.notna(), "").astype(str).str.strip()
+        skip = [s for s, cols in typed_cols.items() if c in cols]
+        if skip:
+            part = part.mask(source.isin(skip), "")
+        has = part.ne("")
+        empty = sample.eq("")
+        sample = sample.mask(has & empty, part).mask(has & ~empty, sample + " \n " + part)
+
+    big['numero_proc_norm'] = norm
+    big['sample_text'] = sample
+
+    keys = norm.where(norm.ne(""), "ROW_" + pd.Series(big.index.astype(str), index=big.index))
+    rows = pd.DataFrame({
+        'key': keys,
+        'numero_processo': big['numero_processo'].astype(object) if 'numero_processo' in big.columns else "",
+        'txt': sample,
+        'src': big['__source'].astype(object) if '__source' in big.columns else "",
+    })
+    first = rows.drop_duplicates('key')
+    order = first['key']
+    texts = rows[rows['txt'].ne("")].groupby('key', sort=False)['txt'].agg('\n---\n'.join).reindex(order, fill_value="")
+    src = rows[rows['src'].astype(bool)].drop_duplicates(['key', 'src']).sort_values('src', kind='stable')
+    sources = src.groupby('key', sort=False)['src'].agg(','.join).reindex(order, fill_value="")
+
+    num = first['numero_processo']
+    return finish_consolidated({
+        'numero_processo': list(num.mask(num.eq(""), order)),
+        'numero_proc_norm': list(order),
+        'sample_text': list(texts),
+        'sources': list(sources),
+    }, fast=True)
+
+
+ENGINES = {'legacy': consolidate_and_flag, 'fast': consolidate_and_flag_fast}
+
+
+# --- out-of-core mode -------------------------------------------------------
+# Rows are hash-partitioned by numero_proc_norm into spill files during ingestion,
+# then each partition is consolidated on its own, so memory is bounded by the
+# largest partition instead of the whole dataset. Groups are emitted in order of
+# their first row (k-way merge of the partition results), which is the order the
+# in-memory dict produces.
+
+CSV_ENCODINGS = ("utf-8", "latin1")
+
+
+def _encode_missing(v):
+    # JSON has no NaN; a missing numero_processo must survive the spill as NaN
+    return None if isinstance(v, float) and v != v else v
+
+
+def _decode_missing(v):
+    return float('nan') if v is None else v
+
+
+def _next_encoding(enc):
+    i = CSV_ENCODINGS.index(enc) + 1
+    return CSV_ENCODINGS[i] if i < len(CSV_ENCODINGS) else None
+
+
+def _spill_file(f, encoding, columns, text_cols, spills, start_idx, chunksize, shard=None, schemas=None, typed_cols=None):
+    idx = start_idx
+    skip = (typed_cols or {}).get(os.path.basename(f), ())
+    for chunk in read_csv(f, schemas, encoding=encoding, chunksize=chunksize):
+        chunk['__source'] = os.path.basename(f)
+        # align to the columns of the concatenated frame so row.get() sees the
+        # same missing values as the in-memory path
+        chunk = chunk.reindex(columns=columns)
+        for _, row in chunk.iterrows():
+            key = proc_number(row) or f"ROW_{idx}"
+            if not in_shard(key, shard):
+                idx += 1
+                continue
+            rec = [idx, key, _encode_missing(row.get('numero_processo', '')), make_sample_text(row, text_cols, skip), row.get('__source', '')]
+            spills[stable_hash(key) % len(spills)].write(json.dumps(rec, ensure_ascii=False) + "\n")
+            idx += 1
+    return idx - start_idx
+
+
+def _spill_all(paths, encodings, spill_dir, n_partitions, chunksize, shard=None, schemas=None):
+    """Spill every readable CSV into the partition files.
+
+    Returns the (file, rows) loaded, or None when a file could not be read with the
+    encoding assumed for it; `encodings` is then updated and the caller must spill
+    again, since dropping a file (or re-reading its header) can change the column union.
+    """
+    columns = []
+    text_cols = set()
+    typed_cols = typed_columns(paths, schemas)
+    for f in paths:
+        if encodings[f] is None:
+            continue
+        try:
+            empty = read_csv(f, schemas, encoding=encodings[f], nrows=0)
+            header = list(empty.columns)
+            text_cols.update(text_columns(empty))
+        except Exception:
+            encodings[f] = _next_encoding(encodings[f])
+            if encodings[f] is None:
+                print(f"Falha ao ler {f}, pulando.")
+            return None
+        for c in header + ['__source']:
+            if c not in columns:
+                columns.append(c)
+    text_cols = [c for c in columns if c in text_cols]
+
+    spills = [open(Path(spill_dir) / f"part_{i:04d}.jsonl", "w", encoding="utf-8") for i in range(n_partitions)]
+    loaded = []
+    try:
+        idx = 0
+        for f in paths:
+            if encodings[f] is None:
+                continue
+            try:
+                n = _spill_file(f, encodings[f], columns, text_cols, spills, idx, chunksize, shard, schemas, typed_cols)
+            except Exception:
+                encodings[f] = _next_encoding(encodings[f])
+                if encodings[f] is None:
+                    print(f"Falha ao ler {f}, pulando.")
+                return None
+            loaded.append((f, n))
+            idx += n
+    finally:
+        for fh in spills:
+            fh.close()
+    return loaded
+
+
+def _consolidate_partition(spill_path, out_path):
+    grouped = {}
+    with open(spill_path, encoding="utf-8") as fh:
+        for line in fh:
+            idx, key, numero_processo, txt, source = json.loads(line)
+            add_to_group(grouped, key, idx, _decode_missing(numero_processo), txt, source)
+    rows = sorted(((v['first_row'], group_to_row(k, v)) for k, v in grouped.items()), key=lambda t: t[0])
+    with open(out_path, "w", encoding="utf-8") as fh:
+        for idx, row in rows:
+            row['numero_processo'] = _encode_missing(row['numero_processo'])
+            fh.write(json.dumps([idx, row], ensure_ascii=False) + "\n")
+
+
+def _iter_consolidated(path):
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            idx, row = json.loads(line)
+            row['numero_processo'] = _decode_missing(row['numero_processo'])
+            yield idx, row
+
+
+def consolidate_out_of_core(paths, csv_path, json_path, n_partitions: int = 64, chunksize: int = 50_000, spill_dir=None, batch_size: int = 10_000, shard=None, schemas=None) -> int:
+    """Out-of-core equivalent of load_csvs + consolidate_and_flag + writing the outputs.
+
+    Returns the number of consolidated rows written (0 means no output was written).
+    """
+    encodings = {f: CSV_ENCODINGS[0] for f in paths}
+    total = 0
+    with tempfile.TemporaryDirectory(prefix="spill_", dir=spill_dir) as tmp:
+        loaded = None
+        while loaded is None:
+            loaded = _spill_all(paths, encodings, tmp, n_partitions, chunksize, shard, schemas)
+        for f, n in loaded:
+            print(f"Loaded: {f} ({n} rows)")
+        parts = []
+        for i in range(n_partitions):
+            out_p = Path(tmp) / f"cons_{i:04d}.jsonl"
+            _consolidate_partition(Path(tmp) / f"part_{i:04d}.jsonl", out_p)
+            parts.append(out_p)
+
+        merged = heapq.merge(*[_iter_consolidated(p) for p in parts], key=lambda t: t[0])
+        if shard is not None:
+            merged = ({**row, ORDER_COL: idx} for idx, row in merged)
+        else:
+            merged = (row for _, row in merged)
+        json_fh = None
+        try:
+            while True:
+                batch = list(islice(merged, batch_size))
+                if not batch:
+                    break
+                df = finish_consolidated(batch)
+                # batches are appended; to_json records of each batch are spliced
+                # into a single array so the file equals a whole-frame to_json
+                records = df.to_json(orient='records', force_ascii=False)[1:-1]
+                if json_fh is None:
+                    df.to_csv(csv_path, index=False)
+                    json_fh = open(json_path, "w", encoding="utf-8")
+                    json_fh.write('[' + records)
+                else:
+                    df.to_csv(csv_path, index=False, mode='a', header=False)
+                    json_fh.write(',' + records)
+                total += len(df)
+            if json_fh is not None:
+                json_fh.write(']')
+        finally:
+            if json_fh is not None:
+                json_fh.close()
+    if total == 0:
+        print("Nenhum dado carregado.")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolida os CSVs de data/ e gera flags iniciais.")
+    parser.add_argument('--out-of-core', action='store_true', help='particiona em disco em vez de carregar tudo na memória')
+    parser.add_argument('--partitions', type=int, default=64, help='número de partições do modo out-of-core')
+    parser.add_argument('--chunksize', type=int, default=50_000, help='linhas lidas por vez no modo out-of-core')
+    parser.add_argument('--spill-dir', default=None, help='diretório para os arquivos temporários de partição')
+    parser.add_argument('--shard', type=parse_shard, default=None, help='processa só o shard i de N (formato i/N)')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='legacy', help='implementação da consolidação em memória')
+    parser.add_argument('--schemas', default=None, help='registro de schemas (padrão: schemas.yml/.yaml/.json na raiz)')
+    args = parser.parse_args(argv)
+    if args.shard and args.engine != 'legacy':
+        parser.error('--shard só é suportado com --engine legacy')
+
+    out_dir = shard_dir(args.shard) if args.shard else Path('outputs')
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = str(out_dir / 'consolidado_flags.csv')
+    json_path = str(out_dir / 'consolidado_flags.json')
+    if args.shard:
+        # an empty shard writes no files; drop leftovers from a previous run
+        for old in (csv_path, json_path):
+            if os.path.exists(old):
+                os.remove(old)
+    t0 = time.perf_counter()
+    schemas = load_schemas(args.schemas)
+    if args.out_of_core:
+        n = consolidate_out_of_core(list_csvs(), csv_path, json_path, args.partitions, args.chunksize, args.spill_dir, shard=args.shard, schemas=schemas)
+    else:
+        big = load_csvs(schemas=schemas)
+        typed_cols = typed_columns(list_csvs(), schemas) if not big.empty else {}
+        if args.shard:
+            out = consolidate_and_flag(big, shard=args.shard, typed_cols=typed_cols)
+        else:
+            out = ENGINES[args.engine](big, typed_cols=typed_cols)
+        n = len(out)
+        if not out.empty:
+            out.to_csv(csv_path, index=False)
+            out.to_json(json_path, orient='records', force_ascii=False)
+    if args.shard:
+        # written even when the shard is empty: the merge uses it to know the shard ran
+        update_metrics(out_dir, args.shard, 'pipeline', {
+            'processes': n,
+            'seconds': round(time.perf_counter() - t0, 3),
+            'mode': 'out-of-core' if args.out_of_core else 'memory',
+        })
+    if n:
         print(f"Outputs escritos em: {csv_path} e {json_path}")
     else:
         print('Nenhuma saída gerada.')
@@ -0,0 +1,200 @@
+"""
+Features hasheadas: transforma o `sample_text` consolidado em uma matriz esparsa
+(formato CSR, construída em blocos) e pontua os processos com um modelo linear.
+
+Lê: outputs/consolidado_flags.csv
+Gera:
+ - outputs/features/hashed_<hash>.npz  (cache, chaveado pelo hash da entrada + parâmetros)
+ - outputs/features/scores.csv         (apenas se houver modelo linear em --model)
+
+O arquivo .npz guarda `data`, `indices`, `indptr` e `shape`, compatível com
+`scipy.sparse.csr_matrix((data, indices, indptr), shape=shape)`; scipy não é necessário.
+
+O modelo linear é um .npz com `coef` (vetor de tamanho n_features) e `intercept`.
+
+Uso: python starter_scripts/03_hashed_features.py [--n-features 1048576] [--model outputs/modelo_linear.npz]
+"""
+import argparse
+import hashlib
+import re
+import sys
+import zlib
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+N_FEATURES = 2 ** 20
+CHUNK_SIZE = 10_000
+# bump when tokenization/hashing changes so stale caches are not reused
+FEATURES_VERSION = "1"
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    if not isinstance(text, str):
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=2 ** 20)
+def token_index(token: str, n_features: int = N_FEATURES) -> int:
+    # crc32 is stable across processes (unlike the salted builtin hash)
+    return zlib.crc32(token.encode("utf-8")) % n_features
+
+
+def hash_chunk(texts, n_features: int = N_FEATURES):
+    """Hash one block of texts into CSR arrays (indptr relative to the block)."""
+    indptr = [0]
+    indices = []
+    data = []
+    for text in texts:
+        counts = Counter(token_index(t, n_features) for t in tokenize(text))
+        for j in sorted(counts):
+            indices.append(j)
+            data.append(counts[j])
+        indptr.append(len(indices))
+    return (
+        np.asarray(indptr, dtype=np.int64),
+        np.asarray(indices, dtype=np.int32),
+        np.asarray(data, dtype=np.float32),
+    )
+
+
+def build_hashed_matrix(texts, n_features: int = N_FEATURES, chunk_size: int = CHUNK_SIZE):
+    """Build a CSR matrix (dict with data/indices/indptr/shape) block by block."""
+    texts = list(texts)
+    indptr_parts = [np.zeros(1, dtype=np.int64)]
+    indices_parts = []
+    data_parts = []
+    offset = 0
+    for start in range(0, len(texts), chunk_size):
+        ip, ix, dt = hash_chunk(texts[start:start + chunk_size], n_features)
+        indptr_parts.append(ip[1:] + offset)
+        indices_parts.append(ix)
+        data_parts.append(dt)
+        offset += len(ix)
+    return {
+        "data": np.concatenate(data_parts) if data_parts else np.zeros(0, dtype=np.float32),
+        "indices": np.concatenate(indices_parts) if indices_parts else np.zeros(0, dtype=np.int32),
+        "indptr": np.concatenate(indptr_parts),
+        "shape": (len(texts), n_features),
+    }
+
+
+def input_hash(texts, n_features: int = N_FEATURES) -> str:
+    h = hashlib.sha256(f"v{FEATURES_VERSION}:{n_features}".encode("utf-8"))
+    for text in texts:
+        b = (text if isinstance(text, str) else "").encode("utf-8")
+        # length prefix keeps ["ab", "c"] distinct from ["a", "bc"]
+        h.update(len(b).to_bytes(8, "little"))
+        h.update(b)
+    return h.hexdigest()[:16]
+
+
+def save_matrix(matrix, path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        data=matrix["data"],
+        indices=matrix["indices"],
+        indptr=matrix["indptr"],
+        shape=np.asarray(matrix["shape"], dtype=np.int64),
+    )
+
+
+def load_matrix(path):
+    with np.load(path) as z:
+        return {
+            "data": z["data"],
+            "indices": z["indices"],
+            "indptr": z["indptr"],
+            "shape": tuple(int(x) for x in z["shape"]),
+        }
+
+
+def load_or_build(texts, cache_dir="outputs/features", n_features: int = N_FEATURES, chunk_size: int = CHUNK_SIZE):
+    """Return (matrix, cache_path), reusing the cached matrix when the input hash matches."""
+    texts = list(texts)
+    path = Path(cache_dir) / f"hashed_{input_hash(texts, n_features)}.npz"
+    if path.exists():
+        print(f"Features em cache: {path}")
+        return load_matrix(path), path
+    matrix = build_hashed_matrix(texts, n_features, chunk_size)
+    save_matrix(matrix, path)
+    print(f"Features geradas: {path} (linhas={matrix['shape'][0]}, nnz={len(matrix['data'])})")
+    return matrix, path
+
+
+def load_linear_model(path):
+    with np.load(path) as z:
+        coef = np.asarray(z["coef"], dtype=np.float64).ravel()
+        intercept = float(z["intercept"]) if "intercept" in z.files else 0.0
+    return coef, intercept
+
+
+def score_linear(matrix, coef, intercept: float = 0.0):
+    """Batch decision function X @ coef + intercept as one sparse mat-vec product."""
+    n_rows, n_features = matrix["shape"]
+    coef = np.asarray(coef, dtype=np.float64).ravel()
+    if len(coef) != n_features:
+        raise ValueError(f"coef tem {len(coef)} posições, esperado {n_features} (n_features da matriz)")
+    indptr = matrix["indptr"]
+    rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+    contrib = matrix["data"].astype(np.float64) * coef[matrix["indices"]]
+    return np.bincount(rows, weights=contrib, minlength=n_rows) + intercept
+
+
+def sigmoid(scores):
+    # 1 / (1 + exp(-x)) written as exp(-log(1 + exp(-x))): no overflow for large |x|
+    return np.exp(-np.logaddexp(0.0, -np.asarray(scores, dtype=np.float64)))
+
+
+def predict_proba(matrix, coef, intercept: float = 0.0):
+    return sigmoid(score_linear(matrix, coef, intercept))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera features hasheadas de sample_text e pontua com modelo linear.")
+    parser.add_argument("--input", default="outputs/consolidado_flags.csv")
+    parser.add_argument("--cache-dir", default="outputs/features")
+    parser.add_argument("--n-features", type=int, default=None,
+                        help=f"dimensão do hashing (padrão: tamanho do coef do modelo, ou {N_FEATURES} sem modelo)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--model", default="outputs/modelo_linear.npz")
+    args = parser.parse_args(argv)
+
+    p_in = Path(args.input)
+    if not p_in.exists():
+        print(f"Arquivo não encontrado: {p_in}. Rode o pipeline primeiro.")
+        return
+    df = pd.read_csv(p_in, dtype=str, keep_default_na=False)
+
+    p_model = Path(args.model)
+    model = load_linear_model(p_model) if p_model.exists() else None
+    n_features = args.n_features or (len(model[0]) if model is not None else N_FEATURES)
+    if model is not None and len(model[0]) != n_features:
+        print(f"Erro: o modelo {p_model} tem {len(model[0])} coeficientes, mas --n-features é {n_features}.")
+        return 1
+    matrix, _ = load_or_build(df["sample_text"], args.cache_dir, n_features, args.chunk_size)
+
+    if model is None:
+        print(f"Modelo linear não encontrado em {p_model}; pontuação não gerada.")
+        return
+    coef, intercept = model
+    scores = score_linear(matrix, coef, intercept)
+    out = pd.DataFrame({
+        "numero_proc_norm": df["numero_proc_norm"],
+        "score": scores,
+        "prob": sigmoid(scores),
+    })
+    out_path = Path(args.cache_dir) / "scores.csv"
+    out.to_csv(out_path, index=False)
+    print(f"Scores escritos em: {out_path} (linhas={len(out)})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
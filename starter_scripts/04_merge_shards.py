@@ -0,0 +1,147 @@
+"""
+Junta os resultados de execuções em shards (`--shard i/N`) nos arquivos usuais de `outputs/`.
+
+Lê: outputs/shards/shard_<i>_of_<N>/ (um diretório por shard, todos com o mesmo N)
+Gera:
+ - outputs/consolidado_flags.csv e outputs/consolidado_flags.json
+ - outputs/pilot_30_filled.{csv,xlsx} e outputs/pilot_30_filled_advanced.{csv,xlsx} (se gerados nos shards)
+ - outputs/run_metrics.json (métricas somadas por etapa + métricas de cada shard)
+
+As linhas voltam para a ordem da execução sem shards (coluna `__order`). Termina com
+código 1 se faltar algum shard ou se uma etapa não tiver rodado em todos eles.
+
+Uso: python starter_scripts/04_merge_shards.py [--shards-dir outputs/shards] [--out-dir outputs]
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+from starter_scripts.sharding import METRICS_FILE, ORDER_COL, SHARDS_DIR
+
+
+PILOT_TABLES = ["pilot_30_filled", "pilot_30_filled_advanced"]
+
+
+def find_shards(shards_dir):
+    """Return the shard directories ordered by index; raises ValueError if the set is incomplete."""
+    found = {}
+    counts = set()
+    for d in Path(shards_dir).glob("shard_*_of_*"):
+        m = re.fullmatch(r"shard_(\d+)_of_(\d+)", d.name)
+        if m and d.is_dir():
+            found[int(m.group(1))] = d
+            counts.add(int(m.group(2)))
+    if not found:
+        raise ValueError(f"Nenhum shard encontrado em {shards_dir}")
+    if len(counts) > 1:
+        raise ValueError(f"Shards com N diferentes em {shards_dir}: {sorted(counts)}")
+    n = counts.pop()
+    missing = [i for i in range(n) if i not in found]
+    if missing:
+        raise ValueError(f"Shards ausentes (de {n}): {missing}")
+    return [found[i] for i in range(n)]
+
+
+def merge_metrics(dirs):
+    per_shard = {}
+    stages = {}
+    for d in dirs:
+        p = d / METRICS_FILE
+        if not p.exists():
+            raise ValueError(f"{p} não encontrado: o shard não terminou de rodar?")
+        data = json.loads(p.read_text(encoding="utf-8"))
+        per_shard[data.get("shard", d.name)] = data
+        for stage, m in data.get("stages", {}).items():
+            agg = stages.setdefault(stage, {"shards": 0})
+            agg["shards"] += 1
+            for k, v in m.items():
+                if k == "seconds":
+                    agg["seconds_max"] = max(agg.get("seconds_max", 0), v)
+                    agg["seconds_sum"] = round(agg.get("seconds_sum", 0) + v, 3)
+                elif isinstance(v, (int, float)) and not isinstance(v, bool):
+                    agg[k] = agg.get(k, 0) + v
+                elif agg.setdefault(k, v) != v:
+                    # e.g. shards run in different modes
+                    agg[k] = "misto"
+    incomplete = [s for s, agg in stages.items() if agg["shards"] != len(dirs)]
+    if incomplete:
+        raise ValueError(f"Etapas que não rodaram em todos os shards: {incomplete}")
+    return {"shards": len(dirs), "stages": stages, "per_shard": per_shard}
+
+
+def merge_consolidado(dirs, out_dir):
+    records = []
+    for d in dirs:
+        p = d / "consolidado_flags.json"
+        if p.exists():
+            records.extend(json.loads(p.read_text(encoding="utf-8")))
+    if not records:
+        return 0
+    records.sort(key=lambda r: r[ORDER_COL])
+    for r in records:
+        del r[ORDER_COL]
+    df = pd.DataFrame(records)
+    df.to_csv(Path(out_dir) / "consolidado_flags.csv", index=False)
+    df.to_json(Path(out_dir) / "consolidado_flags.json", orient="records", force_ascii=False)
+    return len(df)
+
+
+def merge_table(dirs, name, out_dir):
+    frames = []
+    for d in dirs:
+        p = d / f"{name}.csv"
+        if not p.exists():
+            continue
+        try:
+            frames.append(pd.read_csv(p, dtype=str, keep_default_na=False))
+        except pd.errors.EmptyDataError:
+            # shard without rows for this table
+            continue
+    frames = [f for f in frames if ORDER_COL in f.columns]
+    if not frames:
+        return 0
+    df = pd.concat(frames, ignore_index=True, sort=False)
+    df = df.sort_values(ORDER_COL, key=lambda s: s.astype(int), kind="stable").drop(columns=[ORDER_COL])
+    df.to_csv(Path(out_dir) / f"{name}.csv", index=False)
+    xlsx = df.copy()
+    if "confidence" in xlsx.columns:
+        xlsx["confidence"] = pd.to_numeric(xlsx["confidence"])
+    xlsx.to_excel(Path(out_dir) / f"{name}.xlsx", index=False)
+    return len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Junta as saídas dos shards em outputs/.")
+    parser.add_argument("--shards-dir", default=str(SHARDS_DIR))
+    parser.add_argument("--out-dir", default="outputs")
+    args = parser.parse_args(argv)
+
+    try:
+        dirs = find_shards(args.shards_dir)
+        metrics = merge_metrics(dirs)
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return 1
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    n = merge_consolidado(dirs, out_dir)
+    print(f"consolidado_flags: {n} processos de {len(dirs)} shards")
+    for name in PILOT_TABLES:
+        rows = merge_table(dirs, name, out_dir)
+        if rows:
+            print(f"{name}: {rows} linhas")
+    (out_dir / METRICS_FILE).write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Métricas escritas em: {out_dir / METRICS_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Modo diferencial: roda a implementação legada e a rápida (`--engine fast`) sobre a mesma
+entrada e compara as saídas linha a linha.
+
+Etapas comparadas:
+ - consolidação: consolidate_and_flag vs consolidate_and_flag_fast
+ - flags por linha: text_has_any vs series_has_any (ITAU_PATTERNS, VEIC_PATTERNS)
+ - perguntas: fill_advanced (linha a linha) vs fill_advanced_frame
+
+Para cada etapa informa divergências por coluna, speedup (tempo legado / rápido) e razão
+de memória (pico legado / pico rápido, medido com tracemalloc). Gera outputs/engine_diff.json
+e termina com código 1 se houver qualquer divergência.
+
+Entrada: CSVs de data/ (como o pipeline), opcionalmente uma amostra com semente.
+
+Uso: python starter_scripts/05_compare_engines.py [--sample 10000] [--seed 42]
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(rel_path, name):
+    spec = importlib.util.spec_from_file_location(name, str(REPO_ROOT / rel_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+pipeline = _load('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_engines')
+advanced = _load('scripts/auto_fill_pilot_advanced.py', 'advanced_engines')
+
+
+def _is_nan(v) -> bool:
+    return isinstance(v, float) and v != v
+
+
+def _same(a, b) -> bool:
+    if _is_nan(a) or _is_nan(b):
+        return _is_nan(a) and _is_nan(b)
+    return bool(a == b)
+
+
+def diff_frames(legacy: pd.DataFrame, fast: pd.DataFrame, examples: int = 3) -> dict:
+    """Row-level mismatches per column (rows are compared by position)."""
+    result = {'rows_legacy': len(legacy), 'rows_fast': len(fast), 'columns': {}}
+    n = min(len(legacy), len(fast))
+    extra = abs(len(legacy) - len(fast))
+    for c in list(dict.fromkeys(list(legacy.columns) + list(fast.columns))):
+        if c not in legacy.columns or c not in fast.columns:
+            result['columns'][c] = {'mismatches': max(len(legacy), len(fast)), 'missing_in': 'fast' if c in legacy.columns else 'legacy'}
+            continue
+        a = legacy[c].tolist()
+        b = fast[c].tolist()
+        bad = [i for i in range(n) if not _same(a[i], b[i])]
+        if bad or extra:
+            result['columns'][c] = {
+                'mismatches': len(bad) + extra,
+                'examples': [{'row': i, 'legacy': repr(a[i])[:200], 'fast': repr(b[i])[:200]} for i in bad[:examples]],
+            }
+    result['mismatches'] = sum(v['mismatches'] for v in result['columns'].values())
+    return result
+
+
+def measure(fn):
+    """Run fn twice: once timed, once under tracemalloc for the peak. Returns (result, seconds, peak_bytes)."""
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def compare(name, legacy_fn, fast_fn) -> dict:
+    legacy, t_legacy, m_legacy = measure(legacy_fn)
+    fast, t_fast, m_fast = measure(fast_fn)
+    report = diff_frames(legacy, fast)
+    report.update({
+        'stage': name,
+        'legacy_seconds': round(t_legacy, 4),
+        'fast_seconds': round(t_fast, 4),
+        'speedup': round(t_legacy / t_fast, 2) if t_fast else None,
+        'legacy_peak_bytes': m_legacy,
+        'fast_peak_bytes': m_fast,
+        'memory_ratio': round(m_legacy / m_fast, 2) if m_fast else None,
+    })
+    return report
+
+
+def _fast_flags(texts, families):
+    normalized = pipeline.normalize_series(texts)
+    return pd.DataFrame({k: pipeline.series_has_any(texts, pipeline.compile_patterns(p), normalized) for k, p in families.items()})
+
+
+def run(big: pd.DataFrame, typed_cols=None) -> list:
+    reports = []
+    reports.append(compare(
+        'consolidate_and_flag',
+        lambda: pipeline.consolidate_and_flag(big.copy(), typed_cols=typed_cols),
+        lambda: pipeline.consolidate_and_flag_fast(big.copy(), typed_cols=typed_cols),
+    ))
+
+    rows = big.copy()
+    pipeline.consolidate_and_flag(rows, typed_cols=typed_cols)  # adds the per-row sample_text column
+    texts = rows['sample_text']
+    families = {'itau': pipeline.ITAU_PATTERNS, 'veic': pipeline.VEIC_PATTERNS}
+    reports.append(compare(
+        'text_has_any',
+        lambda: pd.DataFrame({k: [pipeline.text_has_any(t, p) for t in texts] for k, p in families.items()}),
+        lambda: _fast_flags(texts, families),
+    ))
+
+    consolidated = pipeline.consolidate_and_flag(big.copy(), typed_cols=typed_cols)
+    reports.append(compare(
+        'fill_advanced',
+        lambda: pd.DataFrame([advanced.fill_advanced(r) for _, r in consolidated.iterrows()]),
+        lambda: advanced.fill_advanced_frame(consolidated),
+    ))
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara as implementações legada e rápida sobre a mesma entrada.")
+    parser.add_argument('--sample', type=int, default=None, help='usa uma amostra aleatória de N linhas')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default='outputs/engine_diff.json')
+    parser.add_argument('--schemas', default=None, help='registro de schemas (padrão: schemas.yml/.yaml/.json na raiz)')
+    args = parser.parse_args(argv)
+
+    schemas = pipeline.load_schemas(args.schemas)
+    big = pipeline.load_csvs(schemas=schemas)
+    if big.empty:
+        print('Nenhum dado carregado.')
+        return 1
+    if args.sample and args.sample < len(big):
+        big = big.sample(n=args.sample, random_state=args.seed).sort_index()
+
+    reports = run(big, pipeline.typed_columns(pipeline.list_csvs(), schemas))
+    diverged = False
+    for r in reports:
+        status = 'OK' if r['mismatches'] == 0 else 'DIVERGENTE'
+        diverged = diverged or r['mismatches'] > 0
+        print(f"{r['stage']}: {status} (linhas {r['rows_legacy']}/{r['rows_fast']}, "
+              f"speedup {r['speedup']}x, memória {r['memory_ratio']}x)")
+        for c, info in r['columns'].items():
+            print(f"  {c}: {info['mismatches']} divergências")
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps({'input_rows': len(big), 'seed': args.seed if args.sample else None, 'stages': reports},
+                                         ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Relatório escrito em: {args.out}")
+    return 1 if diverged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
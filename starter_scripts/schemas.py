@@ -0,0 +1,168 @@
+"""
+Registro de schemas por fonte: define, por padrão de nome de arquivo, quais colunas
+dos CSVs de data/ são lidas e com que tipo. Colunas fora do schema nunca são
+carregadas (`usecols`), o que reduz tempo de leitura e memória em exportações largas.
+
+O registro é lido de `schemas.yml` / `schemas.yaml` / `schemas.json` na raiz do
+repositório (ou do caminho passado em `--schemas`). Exemplo em config/examples/schemas.yml:
+
+    sources:
+      - pattern: "tjsp_*.csv"          # fnmatch no nome do arquivo (ou no caminho)
+        process_column: nr_processo    # renomeada para numero_processo
+        text_columns: [assunto, movimentacao]
+        types: {valor_causa: float, data_distribuicao: date}
+        drop: [id_interno]
+
+Com `text_columns`, só o número do processo (`process_column` ou, sem ela, as colunas
+padrão numero_processo/processo/processo_num), as colunas de texto e as de `types` são
+lidos; sem ela, todas as colunas exceto `drop`. Colunas com tipo não textual (inclusive
+`date`) ficam fora do `sample_text` dos arquivos desse schema. Arquivos sem schema
+correspondente são lidos inteiros, como texto.
+
+`int`, `float`, `bool` e `date` são lidos como texto e convertidos depois da leitura;
+valores que não convertem viram nulos (um valor inválido não impede a leitura do arquivo).
+"""
+import json
+import os
+from collections import defaultdict
+from fnmatch import fnmatch
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import yaml
+except Exception:
+    yaml = None
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_FILES = ["schemas.yml", "schemas.yaml", "schemas.json"]
+TYPES = ["str", "int", "float", "bool", "category", "date"]
+# process columns read when the schema has text_columns but no process_column
+# (the ones proc_number looks at)
+DEFAULT_PROCESS_COLUMNS = ["numero_processo", "processo", "processo_num"]
+TRUE_VALUES = {"true", "t", "1", "sim", "s", "yes", "y"}
+FALSE_VALUES = {"false", "f", "0", "nao", "não", "n", "no"}
+
+
+def _to_int(s):
+    num = pd.to_numeric(s, errors="coerce")
+    return num.where(num % 1 == 0).astype("Int64")
+
+
+def _to_bool(s):
+    low = s.astype(object).map(lambda v: v.strip().lower() if isinstance(v, str) else v)
+    return low.map(lambda v: True if v in TRUE_VALUES else False if v in FALSE_VALUES else pd.NA).astype("boolean")
+
+
+# every non-text type except category is read as text and converted here, so a
+# value that does not parse becomes null instead of failing the whole file
+CONVERTERS = {
+    "int": _to_int,
+    "float": lambda s: pd.to_numeric(s, errors="coerce").astype("float64"),
+    "bool": _to_bool,
+    "date": lambda s: pd.to_datetime(s, dayfirst=True, errors="coerce"),
+}
+
+
+def _validate(entry, i):
+    if not isinstance(entry, dict) or not entry.get("pattern"):
+        raise ValueError(f"schema #{i}: 'pattern' é obrigatório")
+    types = entry.get("types") or {}
+    bad = {c: t for c, t in types.items() if t not in TYPES}
+    if bad:
+        raise ValueError(f"schema '{entry['pattern']}': tipos desconhecidos {bad} (use {sorted(TYPES)})")
+    return {
+        "pattern": str(entry["pattern"]),
+        "process_column": entry.get("process_column"),
+        "text_columns": list(entry["text_columns"]) if entry.get("text_columns") is not None else None,
+        "types": dict(types),
+        "drop": list(entry.get("drop") or []),
+    }
+
+
+def load_schemas(path=None):
+    """Load and validate the registry; returns [] when there is none. Raises ValueError if malformed."""
+    if path is None:
+        candidates = [REPO_ROOT / name for name in SCHEMA_FILES]
+        path = next((p for p in candidates if p.exists()), None)
+        if path is None:
+            return []
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        cfg = json.loads(text)
+    elif yaml is not None:
+        cfg = yaml.safe_load(text)
+    else:
+        raise ValueError(f"pyyaml não instalado: não é possível ler {path} (use schemas.json)")
+    sources = (cfg or {}).get("sources") or []
+    return [_validate(e, i) for i, e in enumerate(sources)]
+
+
+def find_schema(f, schemas):
+    name = Path(f).name
+    posix = Path(f).as_posix()
+    for s in schemas or []:
+        if fnmatch(name, s["pattern"]) or fnmatch(posix, s["pattern"]):
+            return s
+    return None
+
+
+def typed_columns(paths, schemas=None):
+    """Map each file name (the `__source` of its rows) to the columns its schema declares
+    with a non-text type; files without schema are not in the map.
+
+    Those columns stay out of the sample_text of that file's rows in every mode, whatever
+    dtype pd.concat leaves them with. Files sharing a name get the union of their columns.
+    """
+    typed = {}
+    for f in paths:
+        schema = find_schema(f, schemas)
+        cols = {c for c, t in schema["types"].items() if t != "str"} if schema is not None else set()
+        if cols:
+            typed.setdefault(os.path.basename(f), set()).update(cols)
+    return typed
+
+
+def read_options(schema):
+    """Keyword arguments for pd.read_csv under one schema (None = every column, as text)."""
+    if schema is None:
+        return {"dtype": str}
+    types = schema["types"]
+    drop = set(schema["drop"])
+    if schema["text_columns"] is not None:
+        wanted = [schema["process_column"]] if schema["process_column"] else list(DEFAULT_PROCESS_COLUMNS)
+        wanted += schema["text_columns"] + list(types)
+        wanted = {c for c in wanted if c not in drop}
+        # callable usecols: a column missing from one export is not an error
+        usecols = lambda c: c in wanted
+    else:
+        usecols = lambda c: c not in drop
+    return {
+        "usecols": usecols,
+        "dtype": defaultdict(lambda: str, {c: "category" for c, t in types.items() if t == "category"}),
+    }
+
+
+def apply_schema(df, schema):
+    """Post-read step: rename the process column to numero_processo and convert typed columns."""
+    if schema is None:
+        return df
+    pc = schema["process_column"]
+    if pc and pc != "numero_processo" and pc in df.columns:
+        df = df.rename(columns={pc: "numero_processo"})
+    for c, t in schema["types"].items():
+        if t in CONVERTERS and c in df.columns:
+            df[c] = CONVERTERS[t](df[c])
+    return df
+
+
+def read_csv(f, schemas=None, **kwargs):
+    """pd.read_csv projected/typed by the schema registered for `f` (extra kwargs pass through)."""
+    schema = find_schema(f, schemas)
+    df = pd.read_csv(f, **read_options(schema), **kwargs)
+    if kwargs.get("chunksize"):
+        return (apply_schema(chunk, schema) for chunk in df)
+    return apply_schema(df, schema)
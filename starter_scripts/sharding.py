@@ -0,0 +1,72 @@
+"""
+Execução particionada (shards) do pipeline.
+
+Um shard `i/N` processa apenas os processos cujo hash estável de `numero_proc_norm`
+cai em `i` (módulo N). Todas as etapas (pipeline, preenchimento do piloto) usam a
+mesma chave, então um processo fica sempre no mesmo shard. Cada shard grava em
+`outputs/shards/shard_<i>_of_<N>/`; `04_merge_shards.py` junta os resultados.
+"""
+import argparse
+import json
+import re
+import zlib
+from pathlib import Path
+
+
+SHARDS_DIR = Path("outputs") / "shards"
+METRICS_FILE = "run_metrics.json"
+# shard outputs carry the row position of the unsharded run so the merge can restore it
+ORDER_COL = "__order"
+
+
+def parse_shard(spec: str):
+    """Parse `i/N` (0 <= i < N) into a tuple; usable as an argparse `type`."""
+    m = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", str(spec))
+    if not m:
+        raise argparse.ArgumentTypeError(f"shard inválido: '{spec}' (use i/N, ex.: 0/4)")
+    i, n = int(m.group(1)), int(m.group(2))
+    if n < 1 or i >= n:
+        raise argparse.ArgumentTypeError(f"shard inválido: '{spec}' (precisa 0 <= i < N)")
+    return i, n
+
+
+def stable_hash(key: str) -> int:
+    # crc32 is stable across processes and machines (unlike the salted builtin hash)
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def in_shard(key: str, shard) -> bool:
+    if shard is None:
+        return True
+    i, n = shard
+    return stable_hash(key) % n == i
+
+
+def row_key(row, idx) -> str:
+    """Shard key of a consolidated/pilot row: numero_proc_norm, as produced by the pipeline."""
+    k = row.get('numero_proc_norm')
+    if isinstance(k, str) and k:
+        return k
+    num = row.get('numero_processo')
+    digits = re.sub(r"\D", "", num) if isinstance(num, str) else ""
+    return digits or f"ROW_{idx}"
+
+
+def shard_dir(shard, base=SHARDS_DIR) -> Path:
+    i, n = shard
+    return Path(base) / f"shard_{i}_of_{n}"
+
+
+def update_metrics(out_dir, shard, stage: str, metrics: dict):
+    """Record the metrics of one stage in the shard's run_metrics.json."""
+    path = Path(out_dir) / METRICS_FILE
+    data = {}
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            data = {}
+    data["shard"] = f"{shard[0]}/{shard[1]}"
+    data.setdefault("stages", {})[stage] = metrics
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
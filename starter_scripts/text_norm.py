@@ -0,0 +1,75 @@
+"""
+Normalização de texto compartilhada pelas flags e heurísticas das perguntas.
+
+Forma normalizada: casefold, sem acentos (NFKD sem as marcas combinantes U+0300–U+036F),
+espaços colapsados em um único ' ' e sem espaços nas pontas. As listas de palavras-chave
+são escritas nessa forma (ex.: 'onibus' cobre 'ônibus' e 'ONIBUS').
+
+O consolidado traz a coluna `sample_text_norm`, calculada uma vez por processo;
+`normalize_with_offsets` devolve também, para cada caractere normalizado, a posição
+de origem no texto original (para recortar evidências a partir de um match; ainda
+não usado pelos scripts, que cortam `evidencias` do início do texto original).
+"""
+import re
+import unicodedata
+
+import pandas as pd
+
+
+MARKS_RE = re.compile("[\u0300-\u036f]")
+SPACES_RE = re.compile(r"\s+")
+NORM_COL = "sample_text_norm"
+
+
+def normalize_text(text) -> str:
+    if not isinstance(text, str):
+        return ""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return SPACES_RE.sub(" ", MARKS_RE.sub("", folded)).strip()
+
+
+def normalize_series(texts: pd.Series) -> pd.Series:
+    """normalize_text over a whole Series with pandas string ops (non-str -> '')."""
+    s = texts.astype(object)
+    s = s.where(s.map(lambda v: isinstance(v, str)), "")
+    return (
+        s.str.casefold()
+        .str.normalize("NFKD")
+        .str.replace(MARKS_RE, "", regex=True)
+        .str.replace(SPACES_RE, " ", regex=True)
+        .str.strip()
+        .astype(object)
+    )
+
+
+def normalize_with_offsets(text):
+    """Return (normalized, offsets) where offsets[k] is the index in `text` of the
+    character that produced normalized[k] (a collapsed run of spaces maps to its first space)."""
+    if not isinstance(text, str):
+        return "", []
+    out = []
+    offsets = []
+    space_at = None
+    for i, ch in enumerate(text):
+        for c in unicodedata.normalize("NFKD", ch.casefold()):
+            if MARKS_RE.match(c):
+                continue
+            if c.isspace():
+                if out and space_at is None:
+                    space_at = i
+                continue
+            if space_at is not None:
+                out.append(" ")
+                offsets.append(space_at)
+                space_at = None
+            out.append(c)
+            offsets.append(i)
+    return "".join(out), offsets
+
+
+def original_span(offsets, start: int, end: int):
+    """Map a [start, end) span of the normalized text back to the original text."""
+    if end <= start:
+        pos = offsets[start] if start < len(offsets) else (offsets[-1] + 1 if offsets else 0)
+        return pos, pos
+    return offsets[start], offsets[end - 1] + 1
@@ -0,0 +1,44 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pandas as pd
+
+
+def load_compare_module():
+    repo_root = Path(__file__).resolve().parents[1]
+    mod_path = repo_root / 'starter_scripts' / '05_compare_engines.py'
+    spec = importlib.util.spec_from_file_location('compare_module', str(mod_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_diff_frames_reports_mismatches_per_column():
+    mod = load_compare_module()
+    a = pd.DataFrame({'x': ['1', float('nan'), '3'], 'y': [True, False, True]})
+    b = pd.DataFrame({'x': ['1', float('nan'), '4'], 'y': [True, False, True]})
+    assert mod.diff_frames(a, a.copy())['mismatches'] == 0
+    d = mod.diff_frames(a, b)
+    assert d['mismatches'] == 1
+    assert list(d['columns']) == ['x']
+    assert d['columns']['x']['examples'][0]['row'] == 2
+
+
+def test_engines_agree_on_edge_cases(tmp_path, monkeypatch):
+    mod = load_compare_module()
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'a.csv').write_text(
+        'numero_processo,texto,obs\n'
+        '0000001-79.2023.8.26.0001,Itau Unibanco cobra caminhão,"  "\n'
+        ',"Sentença: indenização de R$ 1.234,56 à vítima em 05/06/2021",\n'
+        '0000001-79.2023.8.26.0001,,CNPJ 12.345.678/0001-90\n', encoding='utf-8')
+    (data / 'b.csv').write_text('processo,texto\n123,ônibus colisão\n,\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('HEURISTICS_MODE', 'lenient')
+    assert mod.main(['--out', str(tmp_path / 'diff.json')]) == 0
+    report = json.loads((tmp_path / 'diff.json').read_text(encoding='utf-8'))
+    # every fixture row was loaded: a parse failure would skip a file and make the diff vacuous
+    assert report['input_rows'] == 5
+    assert report['stages'][0]['rows_legacy'] == 4
@@ -0,0 +1,80 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+
+def load_features_module():
+    repo_root = Path(__file__).resolve().parents[1]
+    mod_path = repo_root / 'starter_scripts' / '03_hashed_features.py'
+    spec = importlib.util.spec_from_file_location('features_module', str(mod_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+TEXTS = ['Itau Unibanco cobrança cobrança', '', 'Caminhão e carreta', None, 'cobrança de ônibus']
+
+
+def to_dense(m):
+    dense = np.zeros(m['shape'])
+    for i in range(m['shape'][0]):
+        for k in range(m['indptr'][i], m['indptr'][i + 1]):
+            dense[i, m['indices'][k]] += m['data'][k]
+    return dense
+
+
+def test_chunked_build_matches_single_block():
+    mod = load_features_module()
+    one = mod.build_hashed_matrix(TEXTS, n_features=64, chunk_size=100)
+    chunked = mod.build_hashed_matrix(TEXTS, n_features=64, chunk_size=2)
+    for k in ('data', 'indices', 'indptr'):
+        assert np.array_equal(one[k], chunked[k])
+    assert one['shape'] == (5, 64)
+    # repeated token is counted, empty/None rows have no entries
+    assert to_dense(one)[0].sum() == 4
+    assert one['indptr'][2] == one['indptr'][1]
+
+
+def test_cache_is_keyed_by_input(tmp_path):
+    mod = load_features_module()
+    m1, p1 = mod.load_or_build(TEXTS, tmp_path, n_features=64)
+    m2, p2 = mod.load_or_build(TEXTS, tmp_path, n_features=64)
+    _, p3 = mod.load_or_build(TEXTS[:-1], tmp_path, n_features=64)
+    assert p1 == p2 and p1.exists()
+    assert p3 != p1
+    assert np.array_equal(m1['indices'], m2['indices'])
+    assert m2['shape'] == (5, 64)
+
+
+def test_score_linear_matches_dense_product():
+    mod = load_features_module()
+    m = mod.build_hashed_matrix(TEXTS, n_features=64)
+    coef = np.random.default_rng(0).normal(size=64)
+    expected = to_dense(m) @ coef + 0.5
+    assert np.allclose(mod.score_linear(m, coef, 0.5), expected)
+    probs = mod.predict_proba(m, coef, 0.5)
+    assert ((probs > 0) & (probs < 1)).all()
+
+
+def test_sigmoid_is_stable_for_large_scores():
+    mod = load_features_module()
+    with np.errstate(over='raise'):
+        probs = mod.sigmoid(np.array([-1000.0, 0.0, 1000.0]))
+    assert np.allclose(probs, [0.0, 0.5, 1.0])
+
+
+def test_main_takes_n_features_from_model(tmp_path, capsys):
+    mod = load_features_module()
+    inp = tmp_path / 'consolidado_flags.csv'
+    inp.write_text('numero_proc_norm,sample_text\n1,Itau Unibanco\n2,caminhão\n', encoding='utf-8')
+    model = tmp_path / 'modelo.npz'
+    np.savez(model, coef=np.ones(32), intercept=-0.5)
+    args = ['--input', str(inp), '--cache-dir', str(tmp_path / 'features'), '--model', str(model)]
+
+    mod.main(args)
+    scores = (tmp_path / 'features' / 'scores.csv').read_text().splitlines()
+    assert len(scores) == 3
+
+    assert mod.main(args + ['--n-features', '64']) == 1
+    assert 'tem 32 coeficientes' in capsys.readouterr().out
@@ -99,3 +99,11 @@ def test_invalid_config_falls_back_to_strict(tmp_path):
     finally:
         if y.exists():
             y.unlink()
+
+
+def test_keywords_match_accent_and_case_variants():
+    mod = load_advanced_module()
+    assert mod.contains_any('SENTENCA proferida', mod.KEYS_SENTENCA)
+    assert mod.contains_any('Acórdão publicado', mod.KEYS_SENTENCA)
+    assert mod.contains_any('vitima fatal', mod.KEYS_VITIMA)
+    assert not mod.contains_any('nada relevante', mod.KEYS_VITIMA)
@@ -24,3 +24,44 @@ def test_text_has_any():
     assert mod.text_has_any('Itau Unibanco cobrança', mod.ITAU_PATTERNS)
     assert mod.text_has_any('Caminhão e carreta envolvidos', mod.VEIC_PATTERNS)
     assert not mod.text_has_any('texto sem correspondência', mod.ITAU_PATTERNS)
+    # word-bounded regex on normalized text: accents and case do not matter, Itaúna is not Itaú
+    texts = ['Banco ITAÚ S.A.', 'ItauUnibanco', 'Comarca de Itaúna', 'itaucard']
+    expected = [True, True, False, False]
+    assert [mod.text_has_any(t, mod.ITAU_PATTERNS) for t in texts] == expected
+    assert mod.series_has_any(texts, mod.compile_patterns(mod.ITAU_PATTERNS)) == expected
+
+
+def test_consolidate_builds_sample_text():
+    import pandas as pd
+    mod = load_pipeline_module()
+    big = pd.DataFrame({'numero_processo': ['1', '1'], 'texto': ['Caminhão', 'cobrança']}, dtype=str)
+    big['__source'] = 'a.csv'
+    out = mod.consolidate_and_flag(big)
+    assert len(out) == 1
+    assert 'Caminhão' in out.loc[0, 'sample_text'] and 'cobrança' in out.loc[0, 'sample_text']
+    assert bool(out.loc[0, 'veiculos_flag'])
+
+
+def test_out_of_core_matches_in_memory(tmp_path, monkeypatch):
+    mod = load_pipeline_module()
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'a.csv').write_text(
+        'numero_processo,texto,data\n'
+        '0000001-79.2023.8.26.0001,Itau Unibanco cobra caminhão,2020\n'
+        ',sem numero,\n'
+        '0000002-00.2023.8.26.0001,outro,2021\n'
+        '0000001-79.2023.8.26.0001,segunda linha,\n', encoding='utf-8')
+    (data / 'b.csv').write_text('processo,texto\n123,ônibus colisão\n0000002-00.2023.8.26.0001,mais\n', encoding='latin1')
+    (data / 'c.csv').write_text('', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+
+    out = mod.consolidate_and_flag(mod.load_csvs())
+    out.to_csv(tmp_path / 'mem.csv', index=False)
+    out.to_json(tmp_path / 'mem.json', orient='records', force_ascii=False)
+
+    n = mod.consolidate_out_of_core(mod.list_csvs(), tmp_path / 'ooc.csv', tmp_path / 'ooc.json',
+                                    n_partitions=3, chunksize=2, batch_size=2)
+    assert n == len(out) == 5
+    assert (tmp_path / 'ooc.csv').read_text() == (tmp_path / 'mem.csv').read_text()
+    assert (tmp_path / 'ooc.json').read_text() == (tmp_path / 'mem.json').read_text()
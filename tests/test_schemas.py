@@ -0,0 +1,154 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+def load_module(rel_path, name):
+    repo_root = Path(__file__).resolve().parents[1]
+    spec = importlib.util.spec_from_file_location(name, str(repo_root / rel_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+SCHEMAS = '''
+sources:
+  - pattern: "tjsp_*.csv"
+    process_column: nr_processo
+    text_columns: [assunto, texto, coluna_ausente]
+    types: {valor_causa: float, data_distribuicao: date}
+  - pattern: "export_*.csv"
+    drop: [id_interno]
+'''
+
+
+def write_inputs(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'tjsp_2023.csv').write_text(
+        'id,nr_processo,assunto,texto,valor_causa,data_distribuicao,obs\n'
+        '1,0000001-79.2023.8.26.0001,Cobrança,Itau Unibanco,1500.5,05/06/2021,ignorar\n'
+        '2,0000002-00.2023.8.26.0001,Acidente,caminhão,,,ignorar\n', encoding='utf-8')
+    (data / 'export_a.csv').write_text('numero_processo,id_interno,texto\n0000001-79.2023.8.26.0001,99,ônibus\n', encoding='utf-8')
+    (data / 'outro.csv').write_text('processo,texto,extra\n123,livre,x\n', encoding='utf-8')
+    (tmp_path / 'schemas.yml').write_text(SCHEMAS, encoding='utf-8')
+
+
+def test_projection_and_types(tmp_path, monkeypatch):
+    write_inputs(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    mod = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_schemas')
+    schemas = mod.load_schemas(tmp_path / 'schemas.yml')
+    big = mod.load_csvs(schemas=schemas)
+    assert 'id' not in big.columns and 'obs' not in big.columns and 'id_interno' not in big.columns
+    assert 'nr_processo' not in big.columns
+    assert big['valor_causa'].dtype == 'float64'
+    assert str(big['data_distribuicao'].dtype).startswith('datetime64')
+    # unmatched files are still read in full
+    assert 'extra' in big.columns
+
+    out = mod.consolidate_and_flag(big)
+    first = out[out['numero_proc_norm'] == '00000017920238260001'].iloc[0]
+    assert 'Itau Unibanco' in first['sample_text'] and 'ônibus' in first['sample_text']
+    assert '1500.5' not in first['sample_text']
+    assert first['sources'] == 'export_a.csv,tjsp_2023.csv'
+
+
+def test_out_of_core_matches_in_memory_with_schemas(tmp_path, monkeypatch):
+    write_inputs(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    mod = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_schemas2')
+    schemas = mod.load_schemas(tmp_path / 'schemas.yml')
+    out = mod.consolidate_and_flag(mod.load_csvs(schemas=schemas))
+    out.to_csv(tmp_path / 'mem.csv', index=False)
+    mod.consolidate_out_of_core(mod.list_csvs(), tmp_path / 'ooc.csv', tmp_path / 'ooc.json',
+                                n_partitions=2, chunksize=1, schemas=schemas)
+    assert (tmp_path / 'ooc.csv').read_text() == (tmp_path / 'mem.csv').read_text()
+
+
+def test_invalid_type_is_rejected(tmp_path):
+    mod = load_module('starter_scripts/schemas.py', 'schemas_mod')
+    p = tmp_path / 'schemas.yml'
+    p.write_text('sources:\n  - pattern: "*.csv"\n    types: {x: decimal}\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        mod.load_schemas(p)
+
+
+def test_typed_column_excluded_with_several_files(tmp_path, monkeypatch):
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'tjsp_a.csv').write_text('numero_processo,assunto,classe\n1,Cobrança,A\n', encoding='utf-8')
+    (data / 'tjsp_b.csv').write_text('numero_processo,assunto,classe\n2,Acidente,B\n', encoding='utf-8')
+    p = tmp_path / 'schemas.yml'
+    p.write_text('sources:\n  - pattern: "tjsp_*.csv"\n    types: {classe: category}\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    mod = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_schemas3')
+    schemas = mod.load_schemas(p)
+
+    out = mod.consolidate_and_flag(mod.load_csvs(schemas=schemas), typed_cols=mod.typed_columns(mod.list_csvs(), schemas))
+    assert list(out['sample_text']) == ['1 \n Cobrança', '2 \n Acidente']
+    out.to_csv(tmp_path / 'mem.csv', index=False)
+    mod.consolidate_out_of_core(mod.list_csvs(), tmp_path / 'ooc.csv', tmp_path / 'ooc.json',
+                                n_partitions=2, chunksize=1, schemas=schemas)
+    assert (tmp_path / 'ooc.csv').read_text() == (tmp_path / 'mem.csv').read_text()
+    mod.main(['--schemas', str(p)])
+    assert Path('outputs/consolidado_flags.csv').read_text() == (tmp_path / 'mem.csv').read_text()
+
+
+def test_default_process_columns_are_read_with_text_columns(tmp_path, monkeypatch):
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'tjsp_a.csv').write_text('numero_processo,assunto,obs\n1,Cobrança,x\n1,Acidente,y\n', encoding='utf-8')
+    p = tmp_path / 'schemas.yml'
+    p.write_text('sources:\n  - pattern: "tjsp_*.csv"\n    text_columns: [assunto]\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    mod = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_schemas4')
+    big = mod.load_csvs(schemas=mod.load_schemas(p))
+    assert list(big.columns) == ['numero_processo', 'assunto', '__source']
+    out = mod.consolidate_and_flag(big)
+    assert list(out['numero_proc_norm']) == ['1']
+    assert out['sample_text'].iloc[0] == '1 \n Cobrança\n---\n1 \n Acidente'
+
+
+def test_typed_columns_follow_each_file_schema(tmp_path, monkeypatch):
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'tjsp_a.csv').write_text('numero_processo,assunto,data\n1,Cobrança,05/06/2021\n', encoding='utf-8')
+    (data / 'outro.csv').write_text('numero_processo,data\n2,data livre\n', encoding='utf-8')
+    p = tmp_path / 'schemas.yml'
+    p.write_text('sources:\n  - pattern: "tjsp_*.csv"\n    types: {data: date}\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    mod = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_schemas5')
+    schemas = mod.load_schemas(p)
+    typed = mod.typed_columns(mod.list_csvs(), schemas)
+    assert typed == {'tjsp_a.csv': {'data'}}
+
+    out = mod.consolidate_and_flag(mod.load_csvs(schemas=schemas), typed_cols=typed)
+    # unmatched files are read as text: their 'data' column stays in sample_text
+    assert list(out['sample_text']) == ['2 \n data livre', '1 \n Cobrança']
+    fast = mod.consolidate_and_flag_fast(mod.load_csvs(schemas=schemas), typed_cols=typed)
+    assert fast.equals(out)
+    out.to_csv(tmp_path / 'mem.csv', index=False)
+    mod.consolidate_out_of_core(mod.list_csvs(), tmp_path / 'ooc.csv', tmp_path / 'ooc.json',
+                                n_partitions=2, chunksize=1, schemas=schemas)
+    assert (tmp_path / 'ooc.csv').read_text() == (tmp_path / 'mem.csv').read_text()
+
+
+def test_unparseable_typed_values_become_null(tmp_path, monkeypatch):
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'tjsp_a.csv').write_text(
+        'numero_processo,valor_causa,qtd,urgente\n'
+        '1,"1.500,50",2,sim\n'
+        '2,1500.5,2.5,talvez\n', encoding='utf-8')
+    p = tmp_path / 'schemas.yml'
+    p.write_text('sources:\n  - pattern: "tjsp_*.csv"\n    types: {valor_causa: float, qtd: int, urgente: bool}\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    mod = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_schemas6')
+    big = mod.load_csvs(schemas=mod.load_schemas(p))
+    assert len(big) == 2
+    assert big['valor_causa'].isna().tolist() == [True, False]
+    assert big['valor_causa'].iloc[1] == 1500.5
+    assert str(big['qtd'].dtype) == 'Int64' and big['qtd'].isna().tolist() == [False, True]
+    assert str(big['urgente'].dtype) == 'boolean' and big['urgente'].isna().tolist() == [False, True]
@@ -0,0 +1,99 @@
+import importlib.util
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_module(rel_path, name):
+    spec = importlib.util.spec_from_file_location(name, str(REPO_ROOT / rel_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_parse_shard():
+    mod = load_module('starter_scripts/sharding.py', 'sharding_mod')
+    assert mod.parse_shard('1/4') == (1, 4)
+    for bad in ('4/4', '1', 'a/b', '0/0'):
+        with pytest.raises(Exception):
+            mod.parse_shard(bad)
+    # every key lands in exactly one shard
+    keys = [str(k) for k in range(50)]
+    assert sum(mod.in_shard(k, (i, 3)) for k in keys for i in range(3)) == len(keys)
+
+
+def write_data(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    lines = ['numero_processo,texto']
+    for k in range(12):
+        lines.append(f'{k % 7:07d}-00.2023.8.26.0001,texto {k} caminhão' if k % 5 else f',sem numero {k}')
+    (data / 'a.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (data / 'b.csv').write_text('processo,texto\n1,Itau Unibanco\n', encoding='utf-8')
+
+
+def test_sharded_runs_merge_to_unsharded_outputs(tmp_path, monkeypatch):
+    write_data(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    pipeline = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_shard')
+    fill = load_module('scripts/auto_fill_pilot.py', 'fill_shard')
+    adv = load_module('scripts/auto_fill_pilot_advanced.py', 'adv_shard')
+    merge = load_module('starter_scripts/04_merge_shards.py', 'merge_shard')
+
+    pipeline.main([])
+    shutil.copy('outputs/consolidado_flags.csv', 'outputs/pilot_30.csv')
+    fill.main([])
+    adv.main([])
+    expected = {name: Path('outputs', name).read_text() for name in (
+        'consolidado_flags.csv', 'consolidado_flags.json', 'pilot_30_filled.csv', 'pilot_30_filled_advanced.csv')}
+
+    for i in range(3):
+        args = ['--shard', f'{i}/3'] + (['--out-of-core', '--partitions', '2'] if i == 1 else [])
+        pipeline.main(args)
+        fill.main(['--shard', f'{i}/3'])
+        adv.main(['--shard', f'{i}/3'])
+
+    assert merge.main(['--out-dir', 'merged']) == 0
+    for name, text in expected.items():
+        assert Path('merged', name).read_text() == text, name
+    metrics = json.loads(Path('merged', 'run_metrics.json').read_text())
+    assert metrics['shards'] == 3
+    assert metrics['stages']['pipeline']['processes'] == len(json.loads(expected['consolidado_flags.json']))
+
+
+def test_merge_fails_on_missing_shard(tmp_path, monkeypatch):
+    write_data(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    pipeline = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_shard2')
+    merge = load_module('starter_scripts/04_merge_shards.py', 'merge_shard2')
+    pipeline.main(['--shard', '0/2'])
+    assert merge.main(['--out-dir', 'merged']) == 1
+    assert not Path('merged', 'consolidado_flags.csv').exists()
+
+
+def test_merge_does_not_depend_on_listing_order(tmp_path, monkeypatch):
+    write_data(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    pipeline = load_module('starter_scripts/01_pipeline_responder_14_questoes.py', 'pipeline_shard3')
+    merge = load_module('starter_scripts/04_merge_shards.py', 'merge_shard3')
+    pipeline.main([])
+    expected = {name: Path('outputs', name).read_text() for name in ('consolidado_flags.csv', 'consolidado_flags.json')}
+
+    glob = Path.glob
+    for i in range(3):
+        # each "node" lists data/ in a different order
+        if i == 1:
+            monkeypatch.setattr(Path, 'glob', lambda self, pattern: reversed(sorted(glob(self, pattern))))
+        else:
+            monkeypatch.setattr(Path, 'glob', glob)
+        pipeline.main(['--shard', f'{i}/3'])
+    monkeypatch.setattr(Path, 'glob', glob)
+
+    assert merge.main(['--out-dir', 'merged']) == 0
+    for name, text in expected.items():
+        assert Path('merged', name).read_text() == text, name
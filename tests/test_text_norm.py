@@ -0,0 +1,42 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+
+def load_norm_module():
+    repo_root = Path(__file__).resolve().parents[1]
+    mod_path = repo_root / 'starter_scripts' / 'text_norm.py'
+    spec = importlib.util.spec_from_file_location('text_norm_module', str(mod_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+SAMPLES = ['  Ônibus\n\n  COLISÃO  \t Straße ', 'Acórdão: vítima em óbito', 'ﬁm', '', 'a \n---\n b']
+
+
+def test_normalize_text():
+    mod = load_norm_module()
+    assert mod.normalize_text(SAMPLES[0]) == 'onibus colisao strasse'
+    assert mod.normalize_text(SAMPLES[1]) == 'acordao: vitima em obito'
+    assert mod.normalize_text(None) == ''
+
+
+def test_series_and_offsets_agree_with_scalar():
+    mod = load_norm_module()
+    series = mod.normalize_series(pd.Series(SAMPLES + [float('nan')]))
+    assert list(series) == [mod.normalize_text(t) for t in SAMPLES] + ['']
+    for t in SAMPLES:
+        norm, offsets = mod.normalize_with_offsets(t)
+        assert norm == mod.normalize_text(t)
+        assert len(offsets) == len(norm)
+
+
+def test_original_span():
+    mod = load_norm_module()
+    text = SAMPLES[0]
+    norm, offsets = mod.normalize_with_offsets(text)
+    k = norm.index('colisao')
+    start, end = mod.original_span(offsets, k, k + len('colisao'))
+    assert text[start:end] == 'COLISÃO'